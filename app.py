@@ -1,10 +1,21 @@
-from flask import Flask, request, jsonify, send_file
+from flask import Flask, Response, request, jsonify, send_file
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import os
+import re
+import shutil
+import struct
+import subprocess
 import tempfile
-from pydub import AudioSegment
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import functools
+import hashlib
+from collections import deque
 import io
-from urllib.parse import urlparse, parse_qs
+import mmap
 import uuid
 import logging
 
@@ -37,12 +48,112 @@ DEFAULT_CROSSFADE_OUTRO_MS = 300      # ms
 DEFAULT_VOICE_VOLUME       = 0        # dB
 DEFAULT_BACKGROUND_VOLUME  = -12      # dB
 DEFAULT_OUTPUT_FORMAT      = "mp3"    # mp3/aac/wav etc.
+MUTE_BACKGROUND_DB         = -60      # dB, at or below this the background is skipped
+DOWNLOAD_BUFFER_BYTES      = 1 << 20  # read size when copying download bodies
+MAX_VOICE_BYTES            = 100 * 1024 * 1024   # larger voice downloads are refused (413)
+
+# FFmpeg mixing
+MIX_SAMPLE_RATE            = 44100    # Hz, every input is resampled to this
+MIX_CHANNEL_LAYOUT         = "stereo"
+FFMPEG_STALL_TIMEOUT_S     = 120      # seconds without input or output progress before ffmpeg is killed
+FFMPEG_STDERR_TAIL_LINES   = 200      # last stderr lines kept for the error log
+FFMPEG_TERMINATE_GRACE_S   = 2        # after SIGTERM, seconds before ffmpeg is SIGKILLed
+STREAM_CHUNK_BYTES         = 64 * 1024   # max read size when relaying ffmpeg output to the client
+
+# Raw PCM layout used for every pre-decoded (non-voice) input
+PCM_CHANNELS               = 2
+PCM_BYTES_PER_MS           = MIX_SAMPLE_RATE * PCM_CHANNELS * 2 / 1000   # s16le
+PCM_INPUT_ARGS = ["-f", "s16le", "-ar", str(MIX_SAMPLE_RATE), "-ac", str(PCM_CHANNELS)]
+
+# ffmpeg's own mono -> stereo upmix is 3 dB down per channel; pydub copied mono
+# to both channels at full level, so the centre goes to each side at unity
+# instead (stereo passes through unchanged)
+UNITY_UPMIX_FILTER = "pan=stereo|FL=FL+FC|FR=FR+FC"
+
+# Leading argv of every ffmpeg run: only errors on stderr, with no banner and
+# no progress line several times a second
+_FFMPEG_BASE = ("ffmpeg", "-y", "-hide_banner", "-loglevel", "error", "-nostats")
+
+# Encoder/muxer arguments per output_format; anything else goes straight to -f.
+# AAC prefers libfdk_aac when this ffmpeg build has it (see _output_codec_args).
+# Output goes to a pipe, so the muxer can't seek back to fill in lengths: a
+# streamed WAV carries 0xFFFFFFFF RIFF/data sizes (length unknown), and an MP3
+# gets no Xing/Info header, which is why it stays CBR (players estimate a VBR
+# file's duration and seek points from its first frame).
+OUTPUT_CODEC_ARGS = {
+    "mp3": ["-c:a", "libmp3lame", "-b:a", "128k", "-f", "mp3"],
+    "aac": ["-c:a", "aac", "-b:a", "128k", "-f", "adts"],
+    "wav": ["-c:a", "pcm_s16le", "-f", "wav"],
+}
+FDK_AAC_CODEC_ARGS = ["-c:a", "libfdk_aac", "-vbr", "3", "-f", "adts"]
+
+# Fixed assets never change: they are decoded once and kept as PCM on local
+# disk (tmpfs when available), so restarts skip Google Drive and the decode
+FIXED_AUDIO_URLS = (BACKGROUND_MUSIC_URL, BEGINNING_AUDIO_URL, ENDING_AUDIO_URL)
+FIXED_AUDIO_ROLES = {BACKGROUND_MUSIC_URL: "background", BEGINNING_AUDIO_URL: "intro",
+                     ENDING_AUDIO_URL: "outro"}
+FIXED_AUDIO_CACHE_DIR = (
+    "/dev/shm" if os.path.isdir("/dev/shm") and os.access("/dev/shm", os.W_OK)
+    else tempfile.gettempdir()
+)
+
+# Finished mixes, keyed by a hash of every request parameter, so a repeated
+# request is served from disk; least recently used files go past the size cap.
+# Keys hold URLs, not content, so entries also expire in case a file changed.
+OUTPUT_CACHE_DIR           = os.path.join(tempfile.gettempdir(), "mixed_audio_cache")
+OUTPUT_CACHE_MAX_BYTES     = 500 * 1024 * 1024
+OUTPUT_CACHE_MAX_AGE_S     = 24 * 3600   # seconds since the mix was made
+OUTPUT_CACHE_STALE_S       = 3600     # seconds; untouched partial files this old are from a dead worker
+
+# MP4-family voices (M4A etc.) often keep their index (the moov atom) at the end
+# of the file, which ffmpeg can't reach through a pipe; these are spooled to a
+# temporary file first. Matched on Content-Type, else on the file name.
+SEEKABLE_VOICE_TYPES = {"audio/mp4", "audio/m4a", "audio/x-m4a", "video/mp4",
+                        "video/quicktime", "audio/3gpp", "video/3gpp"}
+SEEKABLE_VOICE_EXTENSIONS = (".m4a", ".m4b", ".mp4", ".mov", ".3gp")
+_FILENAME_RE = re.compile(r'filename\*?=(?:[\w-]+\'\')?"?([^";]+)', re.IGNORECASE)
+
+# ffprobe format_name a voice file must have to be returned untouched as output_format
+PASSTHROUGH_FORMATS = {"mp3": "mp3", "aac": "aac", "wav": "wav"}
+
+# File ID in any Drive link shape: /file/d/<id>/view, open?id=<id>, uc?export=download&id=<id>
+_GDRIVE_ID_RE = re.compile(r'(?:/file/d/|[?&]id=|/d/)([A-Za-z0-9_-]{10,})')
+
+# Confirm link on Google Drive's "can't scan for viruses" interstitial page
+# (older pages carry a download_warning cookie name, newer ones a confirm= token)
+_DOWNLOAD_WARNING_HREF_RE = re.compile(rb'href="(/uc\?[^"]*(?:confirm|download_warning)[^"]*)"', re.I)
 
 
 # =========================
 # Helpers
 # =========================
 
+def _make_http_session():
+    """Session with a pooled, retrying adapter shared by every download."""
+    session = requests.Session()
+    adapter = HTTPAdapter(
+        pool_connections=8,
+        pool_maxsize=32,
+        max_retries=Retry(total=3, backoff_factor=0.2, status_forcelist=(500, 502, 503, 504)),
+    )
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+
+# One pooled HTTP session per process so downloads reuse keep-alive connections
+_HTTP = _make_http_session()
+
+
+def _reset_http_session():
+    """Give a forked worker its own session instead of the parent's pooled sockets."""
+    global _HTTP
+    _HTTP = _make_http_session()
+
+
+os.register_at_fork(after_in_child=_reset_http_session)
+
+
 def _normalize_optional_url(url):
     """Treat empty strings / None as not provided."""
     if url is None:
@@ -51,21 +162,82 @@ def _normalize_optional_url(url):
     return s if s else None
 
 
-def download_from_gdrive(share_url, output_path):
-    """Download file from a Google Drive sharing URL into output_path."""
+class _DownloadTooLarge(ValueError):
+    """A download body grew past its size cap."""
+
+
+def _copy_body(response, dest, max_bytes=None, on_chunk=None):
+    """Copy a response body into dest, calling on_chunk per write; _DownloadTooLarge past max_bytes."""
+    response.raw.decode_content = True
+    if max_bytes is None and on_chunk is None:
+        shutil.copyfileobj(response.raw, dest, DOWNLOAD_BUFFER_BYTES)
+        return
+    copied = 0
+    while True:
+        chunk = response.raw.read(DOWNLOAD_BUFFER_BYTES)
+        if not chunk:
+            break
+        copied += len(chunk)
+        if max_bytes is not None and copied > max_bytes:
+            raise _DownloadTooLarge(f"Download is larger than {max_bytes} bytes")
+        dest.write(chunk)
+        if on_chunk is not None:
+            on_chunk()
+
+
+def _start_watchdog(timeout_s, on_expire):
+    """Call on_expire once kick() has not been called for timeout_s; returns (kick, cancel)."""
+    deadline = [time.monotonic() + timeout_s]
+    stopped = threading.Event()
+
+    def watch():
+        while not stopped.wait(max(0, deadline[0] - time.monotonic())):
+            if time.monotonic() >= deadline[0]:
+                on_expire()
+                return
+
+    def kick():
+        deadline[0] = time.monotonic() + timeout_s
+
+    threading.Thread(target=watch, daemon=True).start()
+    return kick, stopped.set
+
+
+def _declared_length(response):
+    """The response's Content-Length as an int, or None if missing or malformed."""
     try:
-        file_id = None
-
-        if "drive.google.com" in share_url:
-            if "/file/d/" in share_url:
-                file_id = share_url.split("/file/d/")[1].split("/")[0]
-            else:
-                parsed_url = urlparse(share_url)
-                query_params = parse_qs(parsed_url.query)
-                file_id = query_params.get('id', [None])[0]
-                if not file_id and 'file/d/' in share_url:
-                    file_id = share_url.split('file/d/')[1].split('/')[0]
+        return int(response.headers['Content-Length'])
+    except (KeyError, ValueError):
+        return None
+
+
+def _gdrive_file_id(share_url):
+    """Extract the file ID from a Google Drive sharing URL; None if there isn't one."""
+    m = _GDRIVE_ID_RE.search(share_url)
+    return m.group(1) if m else None
+
+
+def _is_web_page(response):
+    """Whether a response is an HTML page rather than a file download (headers only)."""
+    if 'attachment' in response.headers.get('Content-Disposition', '').lower():
+        return False
+    return 'text/html' in response.headers.get('Content-Type', '').lower()
+
+
+def _needs_seekable_input(response):
+    """Whether a download is an MP4-family file ffmpeg can't demux from a pipe."""
+    content_type = response.headers.get('Content-Type', '').split(';')[0].strip().lower()
+    if content_type in SEEKABLE_VOICE_TYPES:
+        return True
+    filename = _FILENAME_RE.search(response.headers.get('Content-Disposition', ''))
+    name = filename.group(1) if filename else (response.url or '').split('?')[0]
+    return name.strip().lower().endswith(SEEKABLE_VOICE_EXTENSIONS)
+
 
+def download_from_gdrive(share_url):
+    """Start a download from a Google Drive sharing URL; streamed response or None."""
+    try:
+        file_id = _gdrive_file_id(share_url)
         if not file_id:
             raise ValueError("Could not extract file ID from Google Drive URL")
 
@@ -74,67 +246,739 @@ def download_from_gdrive(share_url, output_path):
         logger.info(f"Downloading from Google Drive: {file_id}")
 
         # Initial request
-        response = requests.get(download_url, stream=True, timeout=60)
-
-        # If Google shows an interstitial (virus scan / warning), follow confirm link
-        if response.status_code == 200 and ('text/html' in response.headers.get('Content-Type', '').lower()):
-            try:
-                lower = response.text.lower()
-            except Exception:
-                lower = ""
-            if 'download_warning' in lower or 'virus scan' in lower or 'download anyway' in lower:
-                import re
-                for line in response.text.split('\n'):
-                    if 'download_warning' in line and 'href' in line:
-                        m = re.search(r'href="([^"]*)"', line)
-                        if m:
-                            confirm_url = m.group(1).replace('&amp;', '&')
-                            response = requests.get(f"https://drive.google.com{confirm_url}", stream=True, timeout=60)
-                            break
+        response = _HTTP.get(download_url, stream=True, timeout=60)
+
+        # If Google shows an interstitial (virus scan / warning), follow confirm link.
+        # Only this small page is ever read into memory; the file itself is not.
+        if response.status_code == 200 and _is_web_page(response):
+            m = _DOWNLOAD_WARNING_HREF_RE.search(response.content)
+            response.close()
+            if not m:
+                logger.error("Google Drive returned a web page instead of the file (not shared, or quota exceeded)")
+                return None
+            confirm_url = m.group(1).decode('utf-8', errors='replace').replace('&amp;', '&')
+            response = _HTTP.get(f"https://drive.google.com{confirm_url}", stream=True, timeout=60)
+            if response.status_code == 200 and _is_web_page(response):
+                logger.error("Google Drive returned a web page instead of the file after confirming")
+                response.close()
+                return None
 
         if response.status_code == 200:
-            with open(output_path, 'wb') as f:
-                for chunk in response.iter_content(chunk_size=8192):
-                    if chunk:
-                        f.write(chunk)
-            logger.info(f"File downloaded successfully: {output_path}")
-            return True
+            return response
 
         logger.error(f"Failed to download file. Status code: {response.status_code}")
-        return False
+        response.close()
+        return None
 
     except Exception as e:
         logger.error(f"Error downloading from Google Drive: {str(e)}")
-        return False
+        return None
 
 
-def download_from_url(url, output_path):
-    """Download file from any direct URL into output_path."""
+def download_from_url(url):
+    """Start a download from any direct URL; streamed response or None."""
     try:
         logger.info(f"Downloading from URL: {url}")
-        response = requests.get(url, stream=True, timeout=60)
+        response = _HTTP.get(url, stream=True, timeout=60)
 
         if response.status_code == 200:
-            with open(output_path, 'wb') as f:
-                for chunk in response.iter_content(chunk_size=8192):
-                    if chunk:
-                        f.write(chunk)
-            logger.info(f"File downloaded successfully: {output_path}")
-            return True
+            return response
 
         logger.error(f"Failed to download file. Status code: {response.status_code}")
-        return False
+        response.close()
+        return None
 
     except Exception as e:
         logger.error(f"Error downloading from URL: {str(e)}")
-        return False
+        return None
 
 
-def _download_any(url, path):
-    """Helper: download from Drive or direct URL based on hostname."""
+def _open_download(url):
+    """Helper: start a download from Drive or direct URL based on hostname."""
     if "drive.google.com" in url.lower():
-        return download_from_gdrive(url, path)
-    return download_from_url(url, path)
+        return download_from_gdrive(url)
+    return download_from_url(url)
+
+
+def _read_body(response, max_bytes=None):
+    """Read a streamed response body fully into memory and close it; None on failure."""
+    buf = io.BytesIO()
+    try:
+        with response:
+            _copy_body(response, buf, max_bytes)
+    except _DownloadTooLarge:
+        raise
+    except Exception as e:
+        logger.error(f"Error downloading {response.url}: {str(e)}")
+        return None
+    logger.info(f"File downloaded successfully: {response.url}")
+    return buf.getvalue()
+
+
+def _spool_body(response, max_bytes=None):
+    """Copy a streamed response body into an anonymous temporary file and close it; None on failure."""
+    spool = tempfile.TemporaryFile()
+    try:
+        with response:
+            _copy_body(response, spool, max_bytes)
+        spool.flush()
+    except _DownloadTooLarge:
+        spool.close()
+        raise
+    except Exception as e:
+        spool.close()
+        logger.error(f"Error downloading {response.url}: {str(e)}")
+        return None
+    logger.info(f"File downloaded successfully: {response.url}")
+    return spool
+
+
+def _decode_download_to_pcm(response):
+    """Decode a streamed download to PCM_INPUT_ARGS layout; closes the response, None on failure."""
+    with response:
+        proc = subprocess.Popen(
+            [*_FFMPEG_BASE, "-i", "pipe:0", "-af", UNITY_UPMIX_FILTER, *PCM_INPUT_ARGS, "pipe:1"],
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE
+        )
+        body_ok = []
+        stderr_tail = deque(maxlen=FFMPEG_STDERR_TAIL_LINES)
+
+        def feed():
+            try:
+                _copy_body(response, proc.stdin, on_chunk=kick)
+                body_ok.append(True)
+            except BrokenPipeError:
+                # ffmpeg gave up on the input; its exit status says why
+                body_ok.append(True)
+            except Exception as e:
+                logger.error(f"Error downloading {response.url}: {str(e)}")
+            finally:
+                try:
+                    proc.stdin.close()
+                except BrokenPipeError:
+                    pass
+
+        with proc:
+            kick, cancel_watchdog = _start_watchdog(FFMPEG_STALL_TIMEOUT_S, proc.kill)
+            threads = [threading.Thread(target=feed, daemon=True),
+                       threading.Thread(target=stderr_tail.extend, args=(proc.stderr,), daemon=True)]
+            for t in threads:
+                t.start()
+            try:
+                pcm = proc.stdout.read()
+                proc.wait()
+            finally:
+                cancel_watchdog()
+            for t in threads:
+                t.join()
+
+    if not body_ok:
+        return None
+    if proc.returncode != 0 or not pcm:
+        stderr = b"".join(stderr_tail).decode("utf-8", errors="replace")
+        logger.error(f"Failed to decode audio: {stderr}")
+        return None
+    logger.info(f"File downloaded successfully: {response.url}")
+    return pcm
+
+
+# Decoded fixed assets, loaded at most once per process
+_pcm_cache = {}                       # url -> decoded PCM, mmap'd (see PCM_INPUT_ARGS)
+_pcm_cache_fds = {}                   # url -> open fd of that PCM's cache file
+_pcm_cache_locks = {url: threading.Lock() for url in FIXED_AUDIO_URLS}
+
+
+def _pcm_cache_path(url):
+    """On-disk location of a fixed asset's decoded PCM, named by role, file ID and layout."""
+    name = f"mixaudio_{FIXED_AUDIO_ROLES[url]}_{_gdrive_file_id(url)}_{MIX_SAMPLE_RATE}_{PCM_CHANNELS}.pcm"
+    return os.path.join(FIXED_AUDIO_CACHE_DIR, name)
+
+
+def _write_cache_file(path, data):
+    """Atomically store data in the disk cache; True on success."""
+    try:
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".mixaudio_")
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+    except OSError as e:
+        logger.warning(f"Could not cache {path}: {str(e)}")
+        return False
+    return True
+
+
+def _map_fd(fd):
+    """Map an open file read-only into memory."""
+    mapped = mmap.mmap(fd, 0, prot=mmap.PROT_READ)
+    if hasattr(mmap, 'MADV_WILLNEED'):
+        mapped.madvise(mmap.MADV_WILLNEED)
+    return mapped
+
+
+def _load_pcm(url):
+    """Download and decode url, streaming the body into the decoder; None on failure."""
+    response = _open_download(url)
+    if response is None:
+        return None
+    return _decode_download_to_pcm(response)
+
+
+def _load_fixed_pcm(url):
+    """_load_pcm for a fixed asset, through the disk cache; fd kept in _pcm_cache_fds."""
+    pcm_path = _pcm_cache_path(url)
+    try:
+        fd = os.open(pcm_path, os.O_RDONLY)
+    except OSError:
+        fd = None
+    if fd is not None and os.fstat(fd).st_size > 0:
+        logger.info(f"Using cached PCM: {pcm_path}")
+    else:
+        if fd is not None:
+            os.close(fd)
+        pcm = _load_pcm(url)
+        if pcm is None:
+            return None
+        if not _write_cache_file(pcm_path, pcm):
+            return pcm
+        fd = os.open(pcm_path, os.O_RDONLY)
+
+    _pcm_cache_fds[url] = fd
+    return _map_fd(fd)
+
+
+def get_audio_pcm(url):
+    """Return decoded PCM for url; fixed assets are loaded once per process."""
+    pcm = _pcm_cache.get(url)
+    if pcm is not None:
+        return pcm
+    if url not in FIXED_AUDIO_URLS:
+        return _load_pcm(url)
+
+    with _pcm_cache_locks[url]:
+        pcm = _pcm_cache.get(url)
+        if pcm is None:
+            pcm = _load_fixed_pcm(url)
+            if pcm is not None:
+                _pcm_cache[url] = pcm
+    return pcm
+
+
+def get_audio_pcm_many(urls):
+    """get_audio_pcm for several URLs, in order; falsy URLs map to None."""
+    results = {url: _pcm_cache[url] for url in urls if url in _pcm_cache}
+    pending = list(dict.fromkeys(url for url in urls if url and url not in results))
+    # Cache hits are plain lookups; threads are only worth it for two or more loads
+    if len(pending) == 1:
+        results[pending[0]] = get_audio_pcm(pending[0])
+    elif pending:
+        with ThreadPoolExecutor(max_workers=len(pending)) as executor:
+            results.update(zip(pending, executor.map(get_audio_pcm, pending)))
+    return [results.get(url) if url else None for url in urls]
+
+
+def preload_fixed_audio():
+    """Warm the PCM cache so requests only have to fetch and decode the voice; never raises."""
+    with ThreadPoolExecutor(max_workers=len(FIXED_AUDIO_URLS)) as executor:
+        futures = {url: executor.submit(get_audio_pcm, url) for url in FIXED_AUDIO_URLS}
+    for url, future in futures.items():
+        # Whatever failed is simply loaded again by the first request that needs it
+        try:
+            pcm = future.result()
+        except Exception:
+            logger.exception(f"Could not preload fixed audio: {url}")
+            continue
+        if pcm is None:
+            logger.error(f"Could not preload fixed audio: {url}")
+
+
+def _probe_format(data):
+    """Return ffprobe's container format_name for in-memory audio, or None."""
+    try:
+        result = subprocess.run(
+            ["ffprobe", "-v", "error", "-show_entries", "format=format_name",
+             "-of", "csv=p=0", "-i", "pipe:0"],
+            input=data, capture_output=True, timeout=30
+        )
+        return result.stdout.decode("utf-8", errors="replace").strip() or None
+    except Exception:
+        return None
+
+
+def _clamp_crossfade(crossfade_ms, pcm):
+    """Clamp a crossfade so it never exceeds (length - 1ms) of the segment it joins."""
+    duration_ms = int(len(pcm) / PCM_BYTES_PER_MS)
+    return max(0, min(crossfade_ms, duration_ms - 1))
+
+
+def _feed_pipe(fd, data, loop=False):
+    """Write data into a pipe (repeatedly if loop, until the reader closes it), then close it."""
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+            while loop:
+                f.write(data)
+    except BrokenPipeError:
+        # ffmpeg stopped reading (e.g. voice ended before the looped background)
+        pass
+
+
+def _stop_ffmpeg(proc):
+    """Close ffmpeg's stdout, SIGTERM it, then SIGKILL after FFMPEG_TERMINATE_GRACE_S."""
+    proc.stdout.close()
+    proc.terminate()
+    try:
+        proc.wait(timeout=FFMPEG_TERMINATE_GRACE_S)
+    except subprocess.TimeoutExpired:
+        proc.kill()
+
+
+@functools.lru_cache(maxsize=None)
+def _has_encoder(name):
+    """Whether the installed ffmpeg was built with the given encoder."""
+    try:
+        result = subprocess.run(["ffmpeg", "-hide_banner", "-encoders"],
+                                capture_output=True, text=True, timeout=30)
+    except Exception:
+        return False
+    return any(line.split()[1:2] == [name] for line in result.stdout.splitlines())
+
+
+def _output_codec_args(output_format):
+    """Encoder/muxer arguments for output_format."""
+    fmt = output_format.lower()
+    if fmt == "aac" and _has_encoder("libfdk_aac"):
+        return FDK_AAC_CODEC_ARGS
+    return OUTPUT_CODEC_ARGS.get(fmt, ["-f", output_format])
+
+
+def _db_to_gain(db):
+    """Convert a dB change to a linear amplitude factor."""
+    return 10 ** (db / 20)
+
+
+def _build_filter_graph(has_background, has_beginning, has_ending, voice_volume, background_volume,
+                        beginning_volume, ending_volume, gap_before_ms, gap_after_ms,
+                        crossfade_intro_ms, crossfade_outro_ms):
+    """Build the -filter_complex graph for voice, [background], [beginning], [ending]."""
+    fmt = f"{UNITY_UPMIX_FILTER},aformat=sample_rates={MIX_SAMPLE_RATE}:channel_layouts={MIX_CHANNEL_LAYOUT}"
+    # The raw PCM demuxer emits very large frames, which acrossfade handles badly
+    # (truncated output); re-frame intro/outro to decoder-sized frames first.
+    reframe = "asetnsamples=n=1024:p=0"
+
+    def gain(db):
+        # volume works in float, so even a 0 dB node costs two sample format
+        # conversions on top of the no-op multiply; leave it out entirely.
+        return f",volume={db}dB" if db != 0 else ""
+
+    if has_background:
+        # Voice/background gains are applied as amix weights, so scaling and
+        # summing happen in one pass over the samples instead of three.
+        voice_gain = _db_to_gain(voice_volume)
+        background_gain = _db_to_gain(background_volume)
+        chains = [
+            f"[0:a]{fmt}[voice]",
+            # input 1 is fed as an endless loop; amix stops with the voice.
+            # Same semantics as pydub's overlay (audioop.add): a plain sum (normalize=0,
+            # no 1/N scaling) saturated back to int16. Staying in s16 from here on
+            # also means the s16 intro/outro join the mix without format conversion.
+            f"[voice][1:a]amix=inputs=2:weights='{voice_gain:.6g} {background_gain:.6g}':"
+            "duration=first:dropout_transition=0:normalize=0,aformat=sample_fmts=s16[mix]",
+        ]
+        next_input = 2
+    else:
+        chains = [f"[0:a]{fmt}{gain(voice_volume)},aformat=sample_fmts=s16[mix]"]
+        next_input = 1
+    # The program is a list of parts (intro, mix, outro) joined by crossfades or
+    # hard cuts. Gaps are apad on the part before them, and each run of hard
+    # cuts becomes one concat node instead of a node (plus silence) per join.
+    parts = ["mix"]
+    crossfades = []             # crossfades[i] joins parts[i] and parts[i + 1]; 0 = hard cut
+    tail_pad_ms = 0
+
+    # Intro
+    if has_beginning:
+        intro_chain = f"[{next_input}:a]{reframe}{gain(beginning_volume)}"
+        next_input += 1
+        if crossfade_intro_ms <= 0 and gap_before_ms > 0:
+            # hard cut with optional gap
+            intro_chain += f",apad=pad_dur={gap_before_ms / 1000:.3f}"
+        chains.append(f"{intro_chain}[intro]")
+        parts.insert(0, "intro")
+        crossfades.insert(0, crossfade_intro_ms)
+
+    # Outro
+    if has_ending:
+        chains.append(f"[{next_input}:a]{reframe}{gain(ending_volume)}[outro]")
+        if crossfade_outro_ms > 0:
+            # Optional silence AFTER the outro (not part of the crossfade)
+            tail_pad_ms = gap_after_ms
+        elif gap_after_ms > 0:
+            # hard cut with optional gap BEFORE the outro
+            chains.append(f"[mix]apad=pad_dur={gap_after_ms / 1000:.3f}[mixgap]")
+            parts[parts.index("mix")] = "mixgap"
+        parts.append("outro")
+        crossfades.append(crossfade_outro_ms)
+
+    def concat(run, label):
+        if len(run) == 1:
+            return run[0]
+        chains.append("".join(f"[{p}]" for p in run) + f"concat=n={len(run)}:v=0:a=1[{label}]")
+        return label
+
+    run = [parts[0]]
+    for i, (part, crossfade_ms) in enumerate(zip(parts[1:], crossfades)):
+        if crossfade_ms > 0:
+            head = concat(run, f"cat{i}")
+            duration = f"{crossfade_ms / 1000:.3f}"
+            # acrossfade cuts the output short when an input is shorter than the
+            # fade. Intro/outro fades are clamped to their length; the voice side
+            # is only known while streaming, so it is padded up to the fade instead.
+            sides = []
+            for j, side in enumerate((head, part)):
+                if side not in ("intro", "outro"):
+                    chains.append(f"[{side}]apad=whole_dur={duration}[min{i}_{j}]")
+                    side = f"min{i}_{j}"
+                sides.append(f"[{side}]")
+            chains.append(
+                f"{''.join(sides)}acrossfade=d={duration}[xfade{i}]"
+            )
+            run = [f"xfade{i}"]
+        else:
+            run.append(part)
+    program = concat(run, "program")
+
+    if tail_pad_ms > 0:
+        chains.append(f"[{program}]apad=pad_dur={tail_pad_ms / 1000:.3f}[out]")
+    else:
+        chains.append(f"[{program}]anull[out]")
+    return ";".join(chains)
+
+
+def mix_audio_with_ffmpeg(voice_response, background_data, beginning_data, ending_data,
+                          output_format, voice_volume, background_volume,
+                          beginning_volume, ending_volume, gap_before_ms, gap_after_ms,
+                          crossfade_intro_ms, crossfade_outro_ms, voice_data=None,
+                          background_fd=None, voice_file=None):
+    """Mix voice + looped background (+ optional intro/outro) in a single ffmpeg pass.
+
+    Returns an iterator over the encoded audio (first chunk already read), or None."""
+    feeds = []                  # (data, loop) per PCM input written through a pipe
+    if background_data is not None and background_fd is None:
+        feeds.append((background_data, True))
+    if beginning_data is not None:
+        feeds.append((beginning_data, False))
+        if crossfade_intro_ms > 0:
+            crossfade_intro_ms = _clamp_crossfade(crossfade_intro_ms, beginning_data)
+    if ending_data is not None:
+        feeds.append((ending_data, False))
+        if crossfade_outro_ms > 0:
+            crossfade_outro_ms = _clamp_crossfade(crossfade_outro_ms, ending_data)
+
+    filter_graph = _build_filter_graph(
+        has_background=background_data is not None,
+        has_beginning=beginning_data is not None,
+        has_ending=ending_data is not None,
+        voice_volume=voice_volume,
+        background_volume=background_volume,
+        beginning_volume=beginning_volume,
+        ending_volume=ending_volume,
+        gap_before_ms=gap_before_ms,
+        gap_after_ms=gap_after_ms,
+        crossfade_intro_ms=crossfade_intro_ms,
+        crossfade_outro_ms=crossfade_outro_ms,
+    )
+
+    pipes = [os.pipe() for _ in feeds]
+    pass_fds = [read_fd for read_fd, _ in pipes]
+
+    if voice_file is not None:
+        # Spooled voice: ffmpeg opens it by path, so it can seek (see SEEKABLE_VOICE_TYPES)
+        cmd = [*_FFMPEG_BASE, "-i", f"/dev/fd/{voice_file.fileno()}"]
+        pass_fds.append(voice_file.fileno())
+    else:
+        cmd = [*_FFMPEG_BASE, "-i", "pipe:0"]
+    if background_fd is not None and background_data is not None:
+        cmd += ["-stream_loop", "-1"] + PCM_INPUT_ARGS + ["-i", f"/dev/fd/{background_fd}"]
+        pass_fds.append(background_fd)
+    for read_fd, _ in pipes:
+        cmd += PCM_INPUT_ARGS + ["-i", f"/dev/fd/{read_fd}"]
+    cmd += ["-filter_complex", filter_graph, "-map", "[out]"]
+    cmd += ["-threads", "0"] + _output_codec_args(output_format)
+    cmd.append("pipe:1")
+
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("Running FFmpeg command: %s", ' '.join(cmd))
+    try:
+        proc = subprocess.Popen(
+            cmd,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            pass_fds=pass_fds,
+        )
+    except Exception:
+        for _, write_fd in pipes:
+            os.close(write_fd)
+        raise
+    finally:
+        # The child holds its own copies of the read ends
+        for read_fd, _ in pipes:
+            os.close(read_fd)
+
+    voice_ok = []
+    voice_errors = []
+    aborted = threading.Event()
+    stderr_tail = deque(maxlen=FFMPEG_STDERR_TAIL_LINES)
+    # A slow voice source or client only stretches the run; ffmpeg is killed
+    # once neither input nor output has moved for FFMPEG_STALL_TIMEOUT_S
+    kick, cancel_watchdog = _start_watchdog(FFMPEG_STALL_TIMEOUT_S, proc.kill)
+
+    def feed_voice():
+        try:
+            if voice_data is not None:
+                proc.stdin.write(voice_data)
+            elif voice_file is None:
+                _copy_body(voice_response, proc.stdin, MAX_VOICE_BYTES, on_chunk=kick)
+            voice_ok.append(True)
+        except BrokenPipeError:
+            # ffmpeg exited early; its exit status reports what went wrong
+            voice_ok.append(True)
+        except Exception as e:
+            if not aborted.is_set():
+                logger.error(f"Error downloading voice audio: {str(e)}")
+            voice_errors.append(e)
+            voice_ok.append(False)
+        finally:
+            try:
+                proc.stdin.close()
+            except BrokenPipeError:
+                pass
+
+    threads = [threading.Thread(target=feed_voice, daemon=True),
+               threading.Thread(target=stderr_tail.extend, args=(proc.stderr,), daemon=True)]
+    threads += [threading.Thread(target=_feed_pipe, args=(write_fd, data, loop), daemon=True)
+                for (_, write_fd), (data, loop) in zip(pipes, feeds)]
+    for t in threads:
+        t.start()
+
+    def finish(completed):
+        """Reap ffmpeg and its helper threads, stopping ffmpeg first unless it completed."""
+        if not completed:
+            aborted.set()
+            _stop_ffmpeg(proc)
+        # Popen's context manager closes stdin/stdout/stderr once everything is
+        # joined; each feeder closes its own pipe when it finishes. On abort the
+        # voice feeder is left to finish on its own: it may be blocked reading the
+        # voice download, and its next write fails now that ffmpeg is gone.
+        with proc:
+            proc.wait()
+            cancel_watchdog()
+            for t in (threads if completed else threads[1:]):
+                t.join()
+
+    def raise_if_failed():
+        if not voice_ok or not voice_ok[0]:
+            raise RuntimeError("Voice audio download was interrupted")
+        if proc.returncode != 0:
+            stderr = b"".join(stderr_tail).decode("utf-8", errors="replace")
+            logger.error(f"FFmpeg failed: {stderr}")
+            raise RuntimeError(f"FFmpeg failed with exit code {proc.returncode}")
+
+    try:
+        first_chunk = proc.stdout.read1(STREAM_CHUNK_BYTES)
+    except BaseException:
+        finish(completed=False)
+        raise
+
+    if not first_chunk:
+        finish(completed=True)
+        if not voice_ok or not voice_ok[0]:
+            if voice_errors and isinstance(voice_errors[0], _DownloadTooLarge):
+                raise voice_errors[0]
+            return None
+        raise_if_failed()
+        return iter(())
+
+    def relay():
+        completed = False
+        try:
+            yield first_chunk
+            while True:
+                chunk = proc.stdout.read1(STREAM_CHUNK_BYTES)
+                if not chunk:
+                    break
+                kick()
+                yield chunk
+            completed = True
+        except GeneratorExit:
+            # The server closes the body when the client disconnects; nobody
+            # will read the rest, so don't let ffmpeg keep a CPU busy on it
+            logger.info("Client disconnected; stopping ffmpeg")
+            raise
+        finally:
+            finish(completed)
+        # Raising once the status line is out makes the server drop the
+        # connection, so a failed mix never looks like a complete short file.
+        raise_if_failed()
+
+    return relay()
+
+
+def _audio_response(audio_file, output_format, unique_id):
+    """send_file for an in-memory audio file object, with its Content-Length set."""
+    size = audio_file.seek(0, os.SEEK_END)
+    audio_file.seek(0)
+    response = send_file(
+        audio_file,
+        mimetype=f'audio/{output_format}',
+        as_attachment=True,
+        download_name=f'mixed_audio_{unique_id}.{output_format}'
+    )
+    response.content_length = size
+    return response
+
+
+def _stream_response(chunks, output_format, unique_id):
+    """Attachment response whose body is sent as the chunks arrive (length unknown)."""
+    return Response(
+        chunks,
+        mimetype=f'audio/{output_format}',
+        headers={'Content-Disposition': f'attachment; filename=mixed_audio_{unique_id}.{output_format}'}
+    )
+
+
+def _output_cache_key(*params):
+    """Hex digest identifying one mix; blake2b is the fastest hashlib digest for short inputs."""
+    return hashlib.blake2b(repr(params).encode('utf-8'), digest_size=16).hexdigest()
+
+
+def _output_cache_path(key, output_format):
+    """Location of a cached mix in OUTPUT_CACHE_DIR."""
+    return os.path.join(OUTPUT_CACHE_DIR, f"{key}.{output_format}")
+
+
+def _cached_output_response(key, output_format, unique_id):
+    """send_file for a cached mix, or None on a miss or an expired entry."""
+    path = _output_cache_path(key, output_format)
+    try:
+        st = os.stat(path)
+        now = time.time()
+        if now - st.st_mtime > OUTPUT_CACHE_MAX_AGE_S:
+            os.unlink(path)
+            return None
+        # atime is the LRU order for _sweep_output_cache; mtime stays the creation time
+        os.utime(path, (now, st.st_mtime))
+        # send_file opens the file straight away, so a concurrent sweep can't
+        # pull it out from under the response once this returns
+        response = send_file(
+            path,
+            mimetype=f'audio/{output_format}',
+            as_attachment=True,
+            download_name=f'mixed_audio_{unique_id}.{output_format}',
+            conditional=True,
+            etag=key
+        )
+    except OSError:
+        return None
+    return response
+
+
+def _sweep_output_cache():
+    """Delete stale partial files, then least recently used mixes until the cache fits OUTPUT_CACHE_MAX_BYTES."""
+    entries = []
+    stale_before = time.time() - OUTPUT_CACHE_STALE_S
+    with os.scandir(OUTPUT_CACHE_DIR) as it:
+        for entry in it:
+            try:
+                st = entry.stat()
+            except OSError:
+                continue
+            if entry.name.startswith('.'):
+                # Being written, unless its writer died mid-mix
+                if entry.name.startswith('.mix_') and st.st_mtime < stale_before:
+                    try:
+                        os.unlink(entry.path)
+                    except OSError:
+                        pass
+                continue
+            entries.append((st.st_atime, st.st_size, entry.path))
+    total = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries):
+        if total <= OUTPUT_CACHE_MAX_BYTES:
+            break
+        try:
+            os.unlink(path)
+        except OSError:
+            pass
+        total -= size
+
+
+def _patch_wav_sizes(f):
+    """Write the real RIFF and data chunk sizes into a WAV that was muxed to a pipe."""
+    size = f.seek(0, os.SEEK_END)
+    f.seek(0)
+    header = f.read(12)
+    if header[:4] != b'RIFF' or header[8:] != b'WAVE':
+        return
+    pos = 12
+    while pos + 8 <= size:
+        f.seek(pos)
+        chunk_id, chunk_size = struct.unpack('<4sI', f.read(8))
+        if chunk_id == b'data':
+            f.seek(pos + 4)
+            f.write(struct.pack('<I', size - pos - 8))
+            f.seek(4)
+            f.write(struct.pack('<I', size - 8))
+            return
+        pos += 8 + chunk_size + (chunk_size & 1)
+
+
+def _tee_to_output_cache(chunks, key, output_format):
+    """Pass the mix through while storing it in the output cache once complete."""
+    def tee():
+        # Created only once the body starts streaming, so an unstarted response leaves nothing behind
+        f = tmp_path = None
+        try:
+            os.makedirs(OUTPUT_CACHE_DIR, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=OUTPUT_CACHE_DIR, prefix=".mix_")
+            f = os.fdopen(fd, 'w+b')
+        except OSError as e:
+            logger.warning(f"Could not cache mixed audio: {str(e)}")
+        completed = False
+        try:
+            for chunk in chunks:
+                if f is not None:
+                    try:
+                        f.write(chunk)
+                    except OSError as e:
+                        logger.warning(f"Could not cache mixed audio: {str(e)}")
+                        f.close()
+                        f = None
+                yield chunk
+            completed = f is not None
+        finally:
+            # Closing the tee early (client disconnect) must also stop ffmpeg
+            if hasattr(chunks, 'close'):
+                chunks.close()
+            try:
+                if f is not None:
+                    with f:
+                        if completed and output_format == "wav":
+                            # Streamed WAV has no length (see OUTPUT_CODEC_ARGS); cached copies do
+                            _patch_wav_sizes(f)
+                if completed:
+                    os.replace(tmp_path, _output_cache_path(key, output_format))
+                    _sweep_output_cache()
+                elif tmp_path is not None:
+                    os.unlink(tmp_path)
+            except OSError as e:
+                logger.warning(f"Could not cache mixed audio: {str(e)}")
+
+    return tee()
 
 
 # =========================
@@ -188,8 +1032,9 @@ def mix_audio():
             return jsonify({"error": "voice_audio_url is required"}), 400
 
         # Levels / output (with sensible defaults)
-        voice_volume = data.get('voice_volume', DEFAULT_VOICE_VOLUME)
-        background_volume = data.get('background_volume', DEFAULT_BACKGROUND_VOLUME)
+        # (floats: these are interpolated into the ffmpeg filter graph)
+        voice_volume = float(data.get('voice_volume', DEFAULT_VOICE_VOLUME))
+        background_volume = float(data.get('background_volume', DEFAULT_BACKGROUND_VOLUME))
         output_format = data.get('output_format', DEFAULT_OUTPUT_FORMAT)
 
         # Intro/outro URLs (use fixed defaults unless overridden)
@@ -201,8 +1046,8 @@ def mix_audio():
         )
 
         # Volumes (defaults to your fixed values)
-        beginning_volume = data.get('beginning_volume', DEFAULT_BEGINNING_VOLUME)
-        ending_volume = data.get('ending_volume', DEFAULT_ENDING_VOLUME)
+        beginning_volume = float(data.get('beginning_volume', DEFAULT_BEGINNING_VOLUME))
+        ending_volume = float(data.get('ending_volume', DEFAULT_ENDING_VOLUME))
 
         # Gaps & crossfades (defaults to your fixed values)
         gap_before_ms = int(data.get('gap_before_ms', DEFAULT_GAP_BEFORE_MS))
@@ -215,165 +1060,138 @@ def mix_audio():
             f"outro={ending_audio_url}"
         )
 
-        # Temp workspace
-        temp_dir = tempfile.mkdtemp()
         unique_id = str(uuid.uuid4())
 
-        voice_file = os.path.join(temp_dir, f"voice_{unique_id}.bin")
-        bg_music_file = os.path.join(temp_dir, f"background_{unique_id}.bin")
-        beginning_file = os.path.join(temp_dir, f"beginning_{unique_id}.bin")
-        ending_file = os.path.join(temp_dir, f"ending_{unique_id}.bin")
-        output_file = os.path.join(temp_dir, f"mixed_{unique_id}.{output_format}")
-
-        created_files = []
-
+        # --- The exact same mix was made before: serve it from disk, nothing is fetched ---
+        # Only the known formats are cached, as output_format becomes the file extension
+        cache_key = None
+        if output_format in OUTPUT_CODEC_ARGS:
+            cache_key = _output_cache_key(
+                voice_audio_url, voice_volume, background_volume, output_format,
+                beginning_audio_url, ending_audio_url, beginning_volume, ending_volume,
+                gap_before_ms, gap_after_ms, crossfade_intro_ms, crossfade_outro_ms,
+                BACKGROUND_MUSIC_URL
+            )
+            cached = _cached_output_response(cache_key, output_format, unique_id)
+            if cached is not None:
+                logger.info(f"Serving cached mix {cache_key}")
+                return cached
+
+        # --- Fixed assets missing from the PCM cache load on a helper thread while the voice opens ---
+        # That load is shared with every later request, so it isn't wasted if the
+        # voice turns out bad; per-request overrides wait until the voice checks out.
+        # A background at or below MUTE_BACKGROUND_DB is inaudible; leave it out.
+        background_url = BACKGROUND_MUSIC_URL if background_volume > MUTE_BACKGROUND_DB else None
+        asset_urls = [background_url, beginning_audio_url, ending_audio_url]
+        cold_fixed_urls = [url for url in asset_urls
+                           if url in FIXED_AUDIO_URLS and url not in _pcm_cache]
+        warmup_future = None
+        if cold_fixed_urls:
+            executor = ThreadPoolExecutor(max_workers=1)
+            warmup_future = executor.submit(get_audio_pcm_many, cold_fixed_urls)
+            # Don't wait for it on error returns; a failed voice is reported straight away
+            executor.shutdown(wait=False)
+
+        voice_response = _open_download(voice_audio_url)
+        if voice_response is None:
+            return jsonify({"error": "Failed to download voice audio"}), 400
+        if _is_web_page(voice_response):
+            voice_response.close()
+            return jsonify({"error": "voice_audio_url returned a web page, not audio"}), 400
+        # Refused before any ffmpeg work when the size is known up front; a body
+        # without (or lying about) Content-Length is cut off at the cap as it streams.
+        voice_length = _declared_length(voice_response)
+        if voice_length is not None and voice_length > MAX_VOICE_BYTES:
+            voice_response.close()
+            return jsonify({"error": f"Voice audio is larger than {MAX_VOICE_BYTES} bytes"}), 413
+
+        response = None
+        voice_file = None
         try:
-            # --- Download inputs ---
-            if not _download_any(voice_audio_url, voice_file):
+            if warmup_future is not None:
+                warmup_future.result()
+            background_data, beginning_data, ending_data = get_audio_pcm_many(asset_urls)
+            if background_url and background_data is None:
+                return jsonify({"error": "Failed to download background music"}), 500
+            if beginning_audio_url and beginning_data is None:
+                return jsonify({"error": "Failed to download beginning (intro) audio"}), 400
+            if ending_audio_url and ending_data is None:
+                return jsonify({"error": "Failed to download ending (outro) audio"}), 400
+
+            # --- MP4-family voice: ffmpeg needs to seek in it, so fetch it to a file first ---
+            if _needs_seekable_input(voice_response):
+                voice_file = _spool_body(voice_response, MAX_VOICE_BYTES)
+                if voice_file is None:
+                    return jsonify({"error": "Failed to download voice audio"}), 400
+
+            # --- Nothing to mix in: return the voice untouched if it's already output_format ---
+            voice_data = None
+            passthrough_format = PASSTHROUGH_FORMATS.get(output_format.lower())
+            if (passthrough_format and voice_file is None and voice_volume == 0 and background_data is None
+                    and beginning_data is None and ending_data is None):
+                voice_data = _read_body(voice_response, MAX_VOICE_BYTES)
+                if voice_data is None:
+                    return jsonify({"error": "Failed to download voice audio"}), 400
+                if _probe_format(voice_data) == passthrough_format:
+                    logger.info("Nothing to mix; returning voice audio without re-encoding")
+                    return _audio_response(io.BytesIO(voice_data), output_format, unique_id)
+
+            # --- Stream voice through one ffmpeg pass: mix, loop, crossfade, encode ---
+            mixed_chunks = mix_audio_with_ffmpeg(
+                voice_response=voice_response,
+                background_data=background_data,
+                beginning_data=beginning_data,
+                ending_data=ending_data,
+                output_format=output_format,
+                voice_volume=voice_volume,
+                background_volume=background_volume,
+                beginning_volume=beginning_volume,
+                ending_volume=ending_volume,
+                gap_before_ms=gap_before_ms,
+                gap_after_ms=gap_after_ms,
+                crossfade_intro_ms=crossfade_intro_ms,
+                crossfade_outro_ms=crossfade_outro_ms,
+                voice_data=voice_data,
+                background_fd=_pcm_cache_fds.get(background_url),
+                voice_file=voice_file,
+            )
+            if mixed_chunks is None:
                 return jsonify({"error": "Failed to download voice audio"}), 400
-            created_files.append(voice_file)
 
-            if not _download_any(BACKGROUND_MUSIC_URL, bg_music_file):
-                return jsonify({"error": "Failed to download background music"}), 500
-            created_files.append(bg_music_file)
-
-            beginning = None
-            if beginning_audio_url:
-                if not _download_any(beginning_audio_url, beginning_file):
-                    return jsonify({"error": "Failed to download beginning (intro) audio"}), 400
-                created_files.append(beginning_file)
-
-            ending = None
-            if ending_audio_url:
-                if not _download_any(ending_audio_url, ending_file):
-                    return jsonify({"error": "Failed to download ending (outro) audio"}), 400
-                created_files.append(ending_file)
-
-            # --- Load audio ---
-            voice = AudioSegment.from_file(voice_file)
-            background = AudioSegment.from_file(bg_music_file)
-            if beginning_audio_url:
-                beginning = AudioSegment.from_file(beginning_file)
-            if ending_audio_url:
-                ending = AudioSegment.from_file(ending_file)
-
-            # --- Adjust levels ---
-            voice = voice + voice_volume
-            background = background + background_volume
-            if beginning is not None:
-                beginning = beginning + beginning_volume
-            if ending is not None:
-                ending = ending + ending_volume
-
-            # --- Prepare background to match voice duration (loop and trim) ---
-            if len(background) < len(voice):
-                loops_needed = len(voice) // len(background) + 1
-                background = background * loops_needed
-            background = background[:len(voice)]
-
-            # --- Overlay voice on background (main mix) ---
-            mixed = voice.overlay(background)
-
-            # --- Compose full program safely (intro/gaps/outro) ---
-            program = mixed
-
-            # Intro
-            if beginning is not None:
-                if crossfade_intro_ms > 0:
-                    cf_intro = max(0, min(crossfade_intro_ms, len(beginning) - 1, len(program) - 1))
-                    if cf_intro > 0:
-                        program = beginning.append(program, crossfade=cf_intro)
-                    else:
-                        program = beginning + program
-                else:
-                    # hard cut with optional gap
-                    if gap_before_ms > 0:
-                        program = beginning + AudioSegment.silent(duration=gap_before_ms) + program
-                    else:
-                        program = beginning + program
-
-            # Outro
-            if ending is not None:
-                if crossfade_outro_ms > 0:
-                    # Crossfade directly from program into outro (avoid fading a tiny silence)
-                    cf_outro = max(0, min(crossfade_outro_ms, len(program) - 1, len(ending) - 1))
-                    if cf_outro > 0:
-                        program = program.append(ending, crossfade=cf_outro)
-                    else:
-                        program = program + ending
-                    # Optional silence AFTER the outro (not part of the crossfade)
-                    if gap_after_ms > 0:
-                        program = program + AudioSegment.silent(duration=gap_after_ms)
-                else:
-                    # hard cut with optional gap BEFORE the outro
-                    if gap_after_ms > 0:
-                        program = program + AudioSegment.silent(duration=gap_after_ms)
-                    program = program + ending
-
-            final_audio = program
-
-            # --- Export ---
-            export_kwargs = {}
-            if output_format.lower() in ("mp3", "aac"):
-                export_kwargs["bitrate"] = "128k"
-
-            final_audio.export(output_file, format=output_format, **export_kwargs)
-
-            with open(output_file, 'rb') as f:
-                mixed_audio_data = f.read()
-
-            # --- Cleanup ---
-            for fp in created_files + [output_file]:
-                try:
-                    if os.path.exists(fp):
-                        os.remove(fp)
-                except Exception:
-                    pass
-            try:
-                os.rmdir(temp_dir)
-            except Exception:
-                pass
+            logger.info("Audio mixing (with fixed intro/outro) started; streaming output")
 
-            logger.info("Audio mixing (with fixed intro/outro) completed successfully")
+            if cache_key is not None:
+                mixed_chunks = _tee_to_output_cache(mixed_chunks, cache_key, output_format)
+            response = _stream_response(mixed_chunks, output_format, unique_id)
+            # ffmpeg is still reading the voice while the body streams out
+            response.call_on_close(voice_response.close)
+            if voice_file is not None:
+                response.call_on_close(voice_file.close)
+            return response
 
-            return send_file(
-                io.BytesIO(mixed_audio_data),
-                mimetype=f'audio/{output_format}',
-                as_attachment=True,
-                download_name=f'mixed_audio_{unique_id}.{output_format}'
-            )
+        except _DownloadTooLarge:
+            return jsonify({"error": f"Voice audio is larger than {MAX_VOICE_BYTES} bytes"}), 413
 
         except Exception as e:
-            # Cleanup on error
-            for fp in created_files:
-                try:
-                    if os.path.exists(fp):
-                        os.remove(fp)
-                except Exception:
-                    pass
-            try:
-                if os.path.exists(temp_dir):
-                    os.rmdir(temp_dir)
-            except Exception:
-                pass
             logger.exception("Error during mix pipeline")
             return jsonify({"error": f"Processing error: {str(e)}"}), 500
 
+        finally:
+            if response is None:
+                voice_response.close()
+                if voice_file is not None:
+                    voice_file.close()
+
     except Exception as e:
         logger.error(f"Error in mix_audio: {str(e)}")
         return jsonify({"error": f"Internal server error: {str(e)}"}), 500
 
 
-@app.route('/mix-audio-url', methods=['POST'])
-def mix_audio_return_url():
-    """Mix audio and return a temporary URL (alternative endpoint)."""
-    try:
-        return mix_audio()
-    except Exception as e:
-        logger.error(f"Error in mix_audio_return_url: {str(e)}")
-        return jsonify({"error": f"Internal server error: {str(e)}"}), 500
+# Alternative endpoint: same view, routed directly by Flask (no re-entrant call)
+app.add_url_rule('/mix-audio-url', view_func=mix_audio, methods=['POST'])
 
 
 if __name__ == '__main__':
+    preload_fixed_audio()
     port = int(os.environ.get('PORT', 5000))
     app.run(host='0.0.0.0', port=port, debug=False)
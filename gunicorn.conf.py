@@ -0,0 +1,21 @@
+# Gunicorn settings, picked up by: gunicorn -c gunicorn.conf.py wsgi:application
+import os
+
+# A small fixed number of workers: cpu_count() reports the host's cores inside
+# a container, and each worker holds its own mixes in memory (512 MB on the
+# free plan). Mixing is mostly network and ffmpeg waits (both release the
+# GIL), so each worker also runs several requests on threads. Set
+# WEB_CONCURRENCY to scale up on a bigger instance.
+workers = int(os.environ.get("WEB_CONCURRENCY", 2))
+worker_class = "gthread"
+threads = int(os.environ.get("GUNICORN_THREADS", 4))
+
+# A mix streams for as long as download + ffmpeg take (ffmpeg is killed after
+# FFMPEG_STALL_TIMEOUT_S in app.py without progress); leave headroom over that
+# before gunicorn considers a worker hung, and let in-flight mixes finish on restart.
+timeout = 180
+graceful_timeout = 180
+
+# Import wsgi.py once in the master so the fixed background/intro/outro are
+# downloaded and decoded a single time and shared copy-on-write by all workers.
+preload_app = True
@@ -0,0 +1,28 @@
+import io
+import shutil
+
+import pytest
+import requests
+import urllib3
+
+
+@pytest.fixture
+def make_response():
+    """Factory for a streamed requests.Response over an in-memory body."""
+    def make(body=b"", headers=None, url="http://example.com/voice.mp3"):
+        response = requests.Response()
+        response.status_code = 200
+        response.url = url
+        response.headers.update(headers or {})
+        response.raw = urllib3.response.HTTPResponse(
+            body=io.BytesIO(body), preload_content=False, status=200
+        )
+        return response
+    return make
+
+
+@pytest.fixture
+def ffmpeg():
+    """Skip the test unless an ffmpeg binary is on PATH."""
+    if shutil.which("ffmpeg") is None:
+        pytest.skip("ffmpeg not installed")
@@ -0,0 +1,72 @@
+import io
+
+import pytest
+
+import app
+
+
+@pytest.mark.parametrize("url", [
+    "https://drive.google.com/file/d/1y5MbuIq01IldamB9HdxvmDSx4wfcn7qr/view?usp=sharing",
+    "https://drive.google.com/open?id=1y5MbuIq01IldamB9HdxvmDSx4wfcn7qr",
+    "https://drive.google.com/uc?export=download&id=1y5MbuIq01IldamB9HdxvmDSx4wfcn7qr",
+    "https://docs.google.com/d/1y5MbuIq01IldamB9HdxvmDSx4wfcn7qr/edit",
+])
+def test_gdrive_file_id_link_shapes(url):
+    assert app._gdrive_file_id(url) == "1y5MbuIq01IldamB9HdxvmDSx4wfcn7qr"
+
+
+def test_gdrive_file_id_missing():
+    assert app._gdrive_file_id("https://drive.google.com/drive/my-drive") is None
+    assert app._gdrive_file_id("https://example.com/voice.mp3") is None
+
+
+@pytest.mark.parametrize("headers, expected", [
+    ({"Content-Type": "text/html; charset=utf-8"}, True),
+    ({"Content-Type": "audio/mpeg"}, False),
+    ({"Content-Type": "application/octet-stream"}, False),
+    ({}, False),
+    # Drive serves the real file as an attachment, whatever its Content-Type
+    ({"Content-Type": "text/html", "Content-Disposition": 'attachment; filename="voice.mp3"'}, False),
+])
+def test_is_web_page(make_response, headers, expected):
+    assert app._is_web_page(make_response(headers=headers)) is expected
+
+
+def test_copy_body_without_cap(make_response):
+    dest = io.BytesIO()
+    app._copy_body(make_response(b"x" * 5000), dest)
+    assert dest.getvalue() == b"x" * 5000
+
+
+def test_copy_body_at_cap(make_response):
+    dest = io.BytesIO()
+    app._copy_body(make_response(b"x" * 5000), dest, max_bytes=5000)
+    assert dest.getvalue() == b"x" * 5000
+
+
+def test_copy_body_over_cap(make_response, monkeypatch):
+    monkeypatch.setattr(app, "DOWNLOAD_BUFFER_BYTES", 1000)
+    dest = io.BytesIO()
+    with pytest.raises(app._DownloadTooLarge):
+        app._copy_body(make_response(b"x" * 5000), dest, max_bytes=4999)
+    # Stopped at the chunk that crossed the cap, which is never written
+    assert len(dest.getvalue()) == 4000
+
+
+def test_oversized_voice_without_length_is_413(make_response, monkeypatch, tmp_path):
+    monkeypatch.setattr(app, "OUTPUT_CACHE_DIR", str(tmp_path))
+    monkeypatch.setattr(app, "MAX_VOICE_BYTES", 1000)
+    monkeypatch.setattr(app, "_open_download", lambda url: make_response(b"x" * 5000))
+    client = app.app.test_client()
+    response = client.post('/mix-audio', json={
+        'voice_audio_url': 'http://example.com/voice.mp3', 'background_volume': -80,
+        'beginning_audio_url': '', 'ending_audio_url': '',
+    })
+    assert response.status_code == 413
+
+
+def test_copy_body_calls_on_chunk(make_response, monkeypatch):
+    monkeypatch.setattr(app, "DOWNLOAD_BUFFER_BYTES", 1000)
+    calls = []
+    app._copy_body(make_response(b"x" * 2500), io.BytesIO(), on_chunk=lambda: calls.append(1))
+    assert len(calls) == 3
@@ -0,0 +1,135 @@
+import array
+import subprocess
+
+import pytest
+
+import app
+
+
+def _graph(**overrides):
+    params = dict(
+        has_background=True, has_beginning=True, has_ending=True,
+        voice_volume=0, background_volume=-12, beginning_volume=0, ending_volume=0,
+        gap_before_ms=250, gap_after_ms=0, crossfade_intro_ms=500, crossfade_outro_ms=300,
+    )
+    params.update(overrides)
+    return app._build_filter_graph(**params)
+
+
+def test_graph_hard_cuts_with_gaps():
+    graph = _graph(crossfade_intro_ms=0, crossfade_outro_ms=0, gap_after_ms=400)
+    assert "[2:a]asetnsamples=n=1024:p=0,apad=pad_dur=0.250[intro]" in graph
+    assert "[mix]apad=pad_dur=0.400[mixgap]" in graph
+    assert "[intro][mixgap][outro]concat=n=3:v=0:a=1[program]" in graph
+    assert "acrossfade" not in graph
+
+
+def test_graph_gap_after_outro_crossfade_pads_the_end():
+    graph = _graph(has_beginning=False, gap_after_ms=400)
+    assert graph.endswith("[xfade0]apad=pad_dur=0.400[out]")
+
+
+def test_graph_gaps_only_apply_to_hard_cuts():
+    graph = _graph(gap_after_ms=0)
+    assert "pad_dur" not in graph
+    assert "concat" not in graph
+
+
+def test_graph_voice_only():
+    graph = _graph(has_background=False, has_beginning=False, has_ending=False)
+    assert graph == (
+        "[0:a]pan=stereo|FL=FL+FC|FR=FR+FC,aformat=sample_rates=44100:channel_layouts=stereo,"
+        "aformat=sample_fmts=s16[mix];[mix]anull[out]"
+    )
+
+
+def test_graph_crossfades():
+    graph = _graph()
+    assert "[2:a]asetnsamples=n=1024:p=0[intro]" in graph
+    assert "[3:a]asetnsamples=n=1024:p=0[outro]" in graph
+    # The voice side is padded up to the fade, so a short voice can't truncate it
+    assert "[mix]apad=whole_dur=0.500[min0_1]" in graph
+    assert "[intro][min0_1]acrossfade=d=0.500[xfade0]" in graph
+    assert "acrossfade=d=0.300[xfade1]" in graph
+    assert graph.endswith("[xfade1]anull[out]")
+
+
+def test_graph_intro_crossfade_outro_cut():
+    graph = _graph(crossfade_outro_ms=0)
+    assert "acrossfade=d=0.500" in graph
+    assert "[xfade0][outro]concat=n=2:v=0:a=1[program]" in graph
+
+
+def _tone(seconds, layout="stereo"):
+    """lavfi input args for a 440 Hz sine peaking at 4095 in every channel."""
+    upmix = "pan=stereo|c0=c0|c1=c0," if layout == "stereo" else ""
+    return ["-f", "lavfi", "-i",
+            f"sine=d={seconds},{upmix}aformat=sample_fmts=s16:sample_rates=44100:channel_layouts={layout}"]
+
+
+def _run_graph(graph, inputs):
+    cmd = [*app._FFMPEG_BASE]
+    for args in inputs:
+        cmd += args
+    cmd += ["-filter_complex", graph, "-map", "[out]", "-f", "s16le", "pipe:1"]
+    result = subprocess.run(cmd, capture_output=True, timeout=60)
+    assert result.returncode == 0, result.stderr.decode()
+    return result.stdout
+
+
+@pytest.mark.parametrize("overrides, voice_s, expected_s", [
+    ({}, 2, 1 + 2 + 1 - 0.5 - 0.3),
+    ({"crossfade_intro_ms": 0, "crossfade_outro_ms": 0, "gap_after_ms": 400}, 2, 1 + 0.25 + 2 + 0.4 + 1),
+    ({"has_beginning": False, "gap_after_ms": 400}, 2, 2 + 1 - 0.3 + 0.4),
+    # A voice shorter than the intro crossfade still gets the whole fade
+    ({}, 0.2, 1 + 0.5 - 0.5 + 1 - 0.3),
+])
+def test_graph_runs_in_ffmpeg(ffmpeg, overrides, voice_s, expected_s):
+    inputs = [_tone(voice_s, "mono"), _tone(30)]
+    if overrides.get("has_beginning", True):
+        inputs.append(_tone(1))
+    inputs.append(_tone(1))
+    pcm = _run_graph(_graph(**overrides), inputs)
+    assert len(pcm) / (app.PCM_BYTES_PER_MS * 1000) == pytest.approx(expected_s, abs=0.05)
+
+
+def test_graph_background_is_mixed_by_weight():
+    graph = _graph(has_beginning=False, has_ending=False)
+    assert "[voice][1:a]amix=inputs=2:weights='1 0.251189'" in graph
+    assert "duration=first" in graph
+    assert "volume=" not in graph
+
+
+def test_graph_zero_db_skips_volume():
+    assert "volume=" not in _graph(has_background=False)
+    assert "volume=3dB" in _graph(has_background=False, has_beginning=False,
+                                  has_ending=False, voice_volume=3)
+
+
+def test_graph_volumes():
+    graph = _graph(beginning_volume=-3, ending_volume=2)
+    assert "[2:a]asetnsamples=n=1024:p=0,volume=-3dB[intro]" in graph
+    assert "[3:a]asetnsamples=n=1024:p=0,volume=2dB[outro]" in graph
+
+
+def _peak(pcm):
+    return max(abs(sample) for sample in array.array("h", pcm))
+
+
+@pytest.mark.parametrize("layout", ["mono", "stereo"])
+def test_voice_keeps_its_level(ffmpeg, layout):
+    # pydub copied mono to both channels at full level; ffmpeg's default
+    # upmix would bring a 4095 peak sine down to 2896
+    graph = _graph(has_background=False, has_beginning=False, has_ending=False)
+    assert _peak(_run_graph(graph, [_tone(0.5, layout)])) == 4095
+
+
+@pytest.mark.parametrize("layout", ["mono", "stereo"])
+def test_decoded_pcm_keeps_its_level(ffmpeg, make_response, layout):
+    wav = subprocess.run(
+        [*app._FFMPEG_BASE, *_tone(0.5, layout), "-f", "wav", "pipe:1"],
+        capture_output=True, check=True, timeout=60,
+    ).stdout
+    pcm = app._decode_download_to_pcm(make_response(wav))
+    assert len(pcm) == pytest.approx(app.PCM_BYTES_PER_MS * 500, abs=app.PCM_BYTES_PER_MS)
+    assert _peak(pcm) == 4095
@@ -0,0 +1,129 @@
+import io
+import os
+import time
+import wave
+
+import pytest
+
+import app
+
+KEY = "0123456789abcdef0123456789abcdef"
+
+
+@pytest.fixture
+def cache_dir(tmp_path, monkeypatch):
+    path = tmp_path / "cache"
+    path.mkdir()
+    monkeypatch.setattr(app, "OUTPUT_CACHE_DIR", str(path))
+    return path
+
+
+def _cached_response(key=KEY, output_format="mp3"):
+    with app.app.test_request_context():
+        return app._cached_output_response(key, output_format, "id")
+
+
+def _store(cache_dir, name, size=100, atime=None, mtime=None):
+    path = cache_dir / name
+    path.write_bytes(b"x" * size)
+    now = time.time()
+    os.utime(path, (now if atime is None else atime, now if mtime is None else mtime))
+    return path
+
+
+def _chunks(parts, fail=False):
+    yield from parts
+    if fail:
+        raise RuntimeError("ffmpeg failed")
+
+
+def test_cache_hit_touches_atime_only(cache_dir):
+    created = time.time() - 600
+    path = _store(cache_dir, f"{KEY}.mp3", atime=created, mtime=created)
+    response = _cached_response()
+    try:
+        assert response is not None
+        response.direct_passthrough = False
+        assert response.get_data() == b"x" * 100
+    finally:
+        response.close()
+    st = os.stat(path)
+    assert st.st_mtime == pytest.approx(created)
+    assert st.st_atime > created + 500
+
+
+def test_cache_miss(cache_dir):
+    assert _cached_response() is None
+
+
+def test_expired_entry_is_removed(cache_dir):
+    old = time.time() - app.OUTPUT_CACHE_MAX_AGE_S - 60
+    path = _store(cache_dir, f"{KEY}.mp3", mtime=old)
+    assert _cached_response() is None
+    assert not path.exists()
+
+
+def test_sweep_removes_least_recently_used_by_atime(cache_dir, monkeypatch):
+    monkeypatch.setattr(app, "OUTPUT_CACHE_MAX_BYTES", 250)
+    now = time.time()
+    # mtime (creation) order is the reverse of atime (last use) order
+    _store(cache_dir, "a.mp3", atime=now - 300, mtime=now - 10)
+    _store(cache_dir, "b.mp3", atime=now - 200, mtime=now - 20)
+    _store(cache_dir, "c.mp3", atime=now - 100, mtime=now - 30)
+    app._sweep_output_cache()
+    assert sorted(os.listdir(cache_dir)) == ["b.mp3", "c.mp3"]
+
+
+def test_sweep_removes_stale_partial_files(cache_dir):
+    _store(cache_dir, ".mix_stale", mtime=time.time() - app.OUTPUT_CACHE_STALE_S - 60)
+    _store(cache_dir, ".mix_live")
+    app._sweep_output_cache()
+    assert sorted(os.listdir(cache_dir)) == [".mix_live"]
+
+
+def test_tee_stores_completed_stream(cache_dir):
+    out = list(app._tee_to_output_cache(_chunks([b"ab", b"cd"]), KEY, "mp3"))
+    assert out == [b"ab", b"cd"]
+    assert os.listdir(cache_dir) == [f"{KEY}.mp3"]
+    assert (cache_dir / f"{KEY}.mp3").read_bytes() == b"abcd"
+
+
+def test_tee_discards_failed_stream(cache_dir):
+    tee = app._tee_to_output_cache(_chunks([b"ab"], fail=True), KEY, "mp3")
+    with pytest.raises(RuntimeError):
+        list(tee)
+    assert os.listdir(cache_dir) == []
+
+
+def test_tee_discards_stream_closed_early(cache_dir):
+    source = _chunks([b"ab", b"cd"])
+    tee = app._tee_to_output_cache(source, KEY, "mp3")
+    assert next(tee) == b"ab"
+    tee.close()
+    assert os.listdir(cache_dir) == []
+    # Closing the tee closes the mix, which is what stops ffmpeg
+    assert source.gi_frame is None
+
+
+def test_unstarted_tee_creates_nothing(cache_dir):
+    app._tee_to_output_cache(_chunks([b"ab"]), KEY, "mp3")
+    assert os.listdir(cache_dir) == []
+
+
+def test_cached_wav_gets_real_sizes(cache_dir):
+    buf = io.BytesIO()
+    with wave.open(buf, "wb") as w:
+        w.setnchannels(2)
+        w.setsampwidth(2)
+        w.setframerate(44100)
+        w.writeframes(b"\x01\x00" * 2 * 1000)
+    streamed = bytearray(buf.getvalue())
+    # What the wav muxer writes to a pipe: unknown RIFF and data sizes
+    streamed[4:8] = b"\xff\xff\xff\xff"
+    data_pos = streamed.index(b"data")
+    streamed[data_pos + 4:data_pos + 8] = b"\xff\xff\xff\xff"
+
+    list(app._tee_to_output_cache(iter([bytes(streamed[:30]), bytes(streamed[30:])]), KEY, "wav"))
+    with wave.open(str(cache_dir / f"{KEY}.wav"), "rb") as w:
+        assert w.getnframes() == 1000
+    assert (cache_dir / f"{KEY}.wav").read_bytes() == buf.getvalue()
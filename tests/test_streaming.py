@@ -0,0 +1,76 @@
+import subprocess
+import threading
+import time
+
+import pytest
+
+import app
+
+
+def test_watchdog_fires_after_inactivity():
+    fired = threading.Event()
+    kick, cancel = app._start_watchdog(0.2, fired.set)
+    try:
+        for _ in range(4):
+            time.sleep(0.1)
+            kick()
+        assert not fired.is_set()
+        assert fired.wait(2)
+    finally:
+        cancel()
+
+
+def test_watchdog_cancel():
+    fired = threading.Event()
+    kick, cancel = app._start_watchdog(0.1, fired.set)
+    cancel()
+    assert not fired.wait(0.3)
+
+
+@pytest.fixture
+def long_voice(ffmpeg):
+    """30 s of mono MP3, long enough that closing after one chunk is mid-stream."""
+    return subprocess.run(
+        [*app._FFMPEG_BASE, "-f", "lavfi", "-i", "sine=d=30", "-c:a", "libmp3lame", "-f", "mp3", "pipe:1"],
+        capture_output=True, check=True, timeout=60,
+    ).stdout
+
+
+def test_closing_the_mix_stops_ffmpeg(long_voice, make_response, monkeypatch):
+    procs = []
+    threads = []
+
+    class RecordingPopen(subprocess.Popen):
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            procs.append(self)
+
+    real_start = threading.Thread.start
+
+    def recording_start(self):
+        threads.append((self, getattr(self._target, "__name__", None)))
+        real_start(self)
+
+    monkeypatch.setattr(subprocess, "Popen", RecordingPopen)
+    monkeypatch.setattr(threading.Thread, "start", recording_start)
+
+    chunks = app.mix_audio_with_ffmpeg(
+        make_response(long_voice), None, None, None, "wav",
+        0, 0, 0, 0, 0, 0, 0, 0,
+    )
+    assert next(chunks)
+    started = time.monotonic()
+    chunks.close()
+    assert time.monotonic() - started < app.FFMPEG_TERMINATE_GRACE_S + 1
+
+    (proc,) = procs
+    assert proc.returncode is not None
+    assert proc.stdout.closed and proc.stderr.closed
+    # finish() has joined the stderr reader and pipe feeders; the voice feeder
+    # is deliberately not waited for, and the watchdog only needs its wakeup
+    left_running = {"feed_voice", "watch"}
+    assert all(not t.is_alive() for t, target in threads if target not in left_running)
+    assert {target for _, target in threads} >= {"feed_voice", "watch"}
+    for t, _ in threads:
+        t.join(timeout=5)
+        assert not t.is_alive()
@@ -0,0 +1,8 @@
+"""WSGI entry point: gunicorn -c gunicorn.conf.py wsgi:application"""
+from app import app, preload_fixed_audio
+
+# Fetch the fixed background/intro/outro before serving; with preload_app this
+# runs once in the gunicorn master and the workers inherit the cache
+preload_fixed_audio()
+
+application = app